@@ -17,6 +17,7 @@
 from decimal import Decimal
 import json
 import os
+import threading
 from uuid import uuid4
 from pydantic import AnyUrl
 from ucp_sdk.models.schemas.shopping.checkout_resp import CheckoutResponse as Checkout
@@ -51,6 +52,8 @@ class RetailStore:
   def __init__(self):
     self._products = {}
     self._checkouts = {}
+    self._checkout_locks = {}
+    self._line_item_indexes = {}
     self._orders = {}
     self._initialize_ucp_metadata()
     self._initialize_products()
@@ -189,24 +192,77 @@ class RetailStore:
           payment=PaymentResponse(handlers=self._ucp_metadata["payment"]["handlers"]),
       )
     else:
-      checkout = self._checkouts.get(checkout_id)
-      if not checkout:
-        raise ValueError(f"Checkout with ID {checkout_id} not found")
-
-    found = False
-    for line_item in checkout.line_items:
-      if line_item.item.id == product_id:
+      checkout = None
+
+    with self._checkout_lock(checkout_id):
+      if checkout is None:
+        checkout = self._checkouts.get(checkout_id)
+        if not checkout:
+          raise ValueError(f"Checkout with ID {checkout_id} not found")
+
+      positions = self._line_item_index(checkout)
+      position = positions.get(product_id)
+      if position is not None:
+        line_item = checkout.line_items[position]
         line_item.quantity += quantity
-        found = True
-        break
-    if not found:
-      order_item = self._get_line_item(product, quantity)
-      checkout.line_items.append(order_item)
+        self._recalculate_line_item(line_item)
+      else:
+        order_item = self._get_line_item(product, quantity)
+        self._recalculate_line_item(order_item)
+        positions[product_id] = len(checkout.line_items)
+        checkout.line_items.append(order_item)
+
+      self._recalculate_checkout(checkout)
+      self._checkouts[checkout_id] = checkout
+
+      return checkout
+
+  def _checkout_lock(self, checkout_id: str) -> threading.Lock:
+    """Returns the lock serializing updates to a single checkout.
 
-    self._recalculate_checkout(checkout)
-    self._checkouts[checkout_id] = checkout
+    Only operations on the same checkout wait on each other; different
+    checkouts are updated in parallel. Locks are only registered for
+    stored checkouts, so unknown IDs don't grow the lock table; they get a
+    private lock and the caller's lookup reports them as not found. A
+    checkout being created has no other users until it is stored.
 
-    return checkout
+    Args:
+        checkout_id (str): ID of the checkout
+
+    Returns:
+        threading.Lock: lock for the checkout
+    """
+    lock = self._checkout_locks.get(checkout_id)
+    if lock is None:
+      if checkout_id not in self._checkouts:
+        return threading.Lock()
+      # setdefault is atomic, so concurrent callers end up with the same lock
+      lock = self._checkout_locks.setdefault(checkout_id, threading.Lock())
+    return lock
+
+  def _line_item_index(self, checkout: Checkout) -> dict[str, int]:
+    """Returns the product ID to line item position index of a checkout.
+
+    Lets add/update/remove find a product's line item without scanning
+    the whole cart. Built on first use and kept in sync by those methods.
+    Only registered for stored checkouts: a checkout still being created
+    gets a temporary index, so a failed first add leaves nothing behind.
+
+    Args:
+        checkout (Checkout): checkout object
+
+    Returns:
+        dict[str, int]: positions in checkout.line_items keyed by product ID
+    """
+    index = self._line_item_indexes.get(checkout.id)
+    if index is None:
+      index = {
+          line_item.item.id: position
+          for position, line_item in enumerate(checkout.line_items)
+      }
+      if checkout.id in self._checkouts:
+        self._line_item_indexes[checkout.id] = index
+    return index
 
   def get_checkout(self, checkout_id: str) -> Checkout | None:
     """Retrieves a Checkout by its ID.
@@ -229,19 +285,24 @@ class RetailStore:
     Returns:
         Checkout: checkout object
     """
-    checkout = self.get_checkout(checkout_id)
+    with self._checkout_lock(checkout_id):
+      checkout = self.get_checkout(checkout_id)
 
-    if checkout is None:
-      raise ValueError(f"Checkout with ID {checkout_id} not found")
-
-    for line_item in checkout.line_items:
-      if line_item.item.id == product_id:
-        checkout.line_items.remove(line_item)
-        break
+      if checkout is None:
+        raise ValueError(f"Checkout with ID {checkout_id} not found")
 
-    self._recalculate_checkout(checkout)
-    self._checkouts[checkout_id] = checkout
-    return checkout
+      positions = self._line_item_index(checkout)
+      position = positions.pop(product_id, None)
+      if position is not None:
+        checkout.line_items.pop(position)
+        # items after the removed one moved up by one
+        for other_id, other_position in positions.items():
+          if other_position > position:
+            positions[other_id] = other_position - 1
+
+      self._recalculate_checkout(checkout)
+      self._checkouts[checkout_id] = checkout
+      return checkout
 
   def update_checkout(
       self, checkout_id: str, product_id: str, quantity: int
@@ -256,19 +317,43 @@ class RetailStore:
     Returns:
         Checkout: checkout object
     """
-    checkout = self.get_checkout(checkout_id)
+    with self._checkout_lock(checkout_id):
+      checkout = self.get_checkout(checkout_id)
 
-    if checkout is None:
-      raise ValueError(f"Checkout with ID {checkout} not found")
+      if checkout is None:
+        raise ValueError(f"Checkout with ID {checkout} not found")
 
-    for line_item in checkout.line_items:
-      if line_item.item.id == product_id:
+      position = self._line_item_index(checkout).get(product_id)
+      if position is not None:
+        line_item = checkout.line_items[position]
         line_item.quantity = quantity
-        break
+        self._recalculate_line_item(line_item)
 
-    self._recalculate_checkout(checkout)
-    self._checkouts[checkout_id] = checkout
-    return checkout
+      self._recalculate_checkout(checkout)
+      self._checkouts[checkout_id] = checkout
+      return checkout
+
+  def _recalculate_line_item(self, line_item: LineItem) -> None:
+    """Recalculates the totals of a single line item."""
+    base_amount = line_item.item.price * line_item.quantity
+    discount = 0
+    line_item.totals = [
+        Total(
+            type="items_discount",
+            display_text="Items Discount",
+            amount=discount,
+        ),
+        Total(
+            type="subtotal",
+            display_text="Subtotal",
+            amount=base_amount - discount,
+        ),
+        Total(
+            type="total",
+            display_text="Total",
+            amount=base_amount - discount,
+        ),
+    ]
 
   def _recalculate_checkout(self, checkout: Checkout) -> None:
     """Recalculates the checkout totals."""
@@ -279,31 +364,15 @@ class RetailStore:
     items_base_amount = 0
     items_discount = 0
 
+    # line item totals are rebuilt only when that line item changes,
+    # here only their discounts are summed up
     for line_item in checkout.line_items:
-      item = line_item.item
-      unit_price = item.price
-      base_amount = unit_price * line_item.quantity
-      discount = 0
-      line_item.totals = [
-          Total(
-              type="items_discount",
-              display_text="Items Discount",
-              amount=discount,
-          ),
-          Total(
-              type="subtotal",
-              display_text="Subtotal",
-              amount=base_amount - discount,
-          ),
-          Total(
-              type="total",
-              display_text="Total",
-              amount=base_amount - discount,
-          ),
-      ]
-
-      items_base_amount += base_amount
-      items_discount += discount
+      if not line_item.totals:
+        self._recalculate_line_item(line_item)
+      items_base_amount += line_item.item.price * line_item.quantity
+      for total in line_item.totals:
+        if total.type == "items_discount":
+          items_discount += total.amount
 
     subtotal = items_base_amount - items_discount
     discount = 0
@@ -370,44 +439,45 @@ class RetailStore:
     Returns:
         Checkout: The updated checkout object.
     """
-    checkout = self.get_checkout(checkout_id)
-    if checkout is None:
-      raise ValueError(f"Checkout with ID {checkout_id} not found")
-
-    if isinstance(checkout, FulfillmentCheckout):
-      dest_id = f"dest_{uuid4().hex[:8]}"
-      destination = FulfillmentDestinationResponse(
-          root=ShippingDestinationResponse(id=dest_id, **address.model_dump())
-      )
+    with self._checkout_lock(checkout_id):
+      checkout = self.get_checkout(checkout_id)
+      if checkout is None:
+        raise ValueError(f"Checkout with ID {checkout_id} not found")
 
-      fulfillment_options = self._get_fulfillment_options()
-      selected_option_id = fulfillment_options[0].id
+      if isinstance(checkout, FulfillmentCheckout):
+        dest_id = f"dest_{uuid4().hex[:8]}"
+        destination = FulfillmentDestinationResponse(
+            root=ShippingDestinationResponse(id=dest_id, **address.model_dump())
+        )
 
-      line_item_ids = [li.item.id for li in checkout.line_items]
+        fulfillment_options = self._get_fulfillment_options()
+        selected_option_id = fulfillment_options[0].id
 
-      group = FulfillmentGroupResponse(
-          id=f"package_{uuid4().hex[:8]}",
-          line_item_ids=line_item_ids,
-          options=fulfillment_options,
-          selected_option_id=selected_option_id,
-      )
+        line_item_ids = [li.item.id for li in checkout.line_items]
 
-      method = FulfillmentMethodResponse(
-          id=f"method_{uuid4().hex[:8]}",
-          type="shipping",
-          line_item_ids=line_item_ids,
-          destinations=[destination],
-          selected_destination_id=dest_id,
-          groups=[group],
-      )
+        group = FulfillmentGroupResponse(
+            id=f"package_{uuid4().hex[:8]}",
+            line_item_ids=line_item_ids,
+            options=fulfillment_options,
+            selected_option_id=selected_option_id,
+        )
 
-      checkout.fulfillment = Fulfillment(
-          root=FulfillmentResponse(methods=[method])
-      )
+        method = FulfillmentMethodResponse(
+            id=f"method_{uuid4().hex[:8]}",
+            type="shipping",
+            line_item_ids=line_item_ids,
+            destinations=[destination],
+            selected_destination_id=dest_id,
+            groups=[group],
+        )
 
-    self._recalculate_checkout(checkout)
-    self._checkouts[checkout_id] = checkout
-    return checkout
+        checkout.fulfillment = Fulfillment(
+            root=FulfillmentResponse(methods=[method])
+        )
+
+      self._recalculate_checkout(checkout)
+      self._checkouts[checkout_id] = checkout
+      return checkout
 
   def start_payment(self, checkout_id: str) -> Checkout | str:
     """Starts the payment process for the checkout.
@@ -418,31 +488,32 @@ class RetailStore:
     Returns:
         Checkout | str: The updated checkout object or error message.
     """
-    checkout = self.get_checkout(checkout_id)
-    if checkout is None:
-      raise ValueError(f"Checkout with ID {checkout} not found")
-
-    if checkout.status == "ready_for_complete":
+    with self._checkout_lock(checkout_id):
+      checkout = self.get_checkout(checkout_id)
+      if checkout is None:
+        raise ValueError(f"Checkout with ID {checkout} not found")
+
+      if checkout.status == "ready_for_complete":
+        return checkout
+
+      messages = []
+      if checkout.buyer is None:
+        messages.append("Provide a buyer email address")
+
+      if (
+          isinstance(checkout, FulfillmentCheckout)
+          and checkout.fulfillment is None
+      ):
+        messages.append("Provide a fulfillment address")
+
+      if messages:
+        return "\n".join(messages)
+
+      self._recalculate_checkout(checkout)
+      checkout.status = "ready_for_complete"
+      self._checkouts[checkout_id] = checkout
       return checkout
 
-    messages = []
-    if checkout.buyer is None:
-      messages.append("Provide a buyer email address")
-
-    if (
-        isinstance(checkout, FulfillmentCheckout)
-        and checkout.fulfillment is None
-    ):
-      messages.append("Provide a fulfillment address")
-
-    if messages:
-      return "\n".join(messages)
-
-    self._recalculate_checkout(checkout)
-    checkout.status = "ready_for_complete"
-    self._checkouts[checkout_id] = checkout
-    return checkout
-
   def place_order(self, checkout_id: str) -> Checkout:
     """Places an order.
 
@@ -452,22 +523,25 @@ class RetailStore:
     Returns:
         Checkout: The Checkout object with order confirmation.
     """
-    checkout = self.get_checkout(checkout_id)
-    if checkout is None:
-      raise ValueError(f"Checkout with ID {checkout} not found")
+    with self._checkout_lock(checkout_id):
+      checkout = self.get_checkout(checkout_id)
+      if checkout is None:
+        raise ValueError(f"Checkout with ID {checkout} not found")
 
-    order_id = f"ORD-{checkout_id}"
+      order_id = f"ORD-{checkout_id}"
 
-    checkout.status = "completed"
-    checkout.order = OrderConfirmation(
-        id=order_id,
-        permalink_url=f"https://example.com/order?id={order_id}",
-    )
+      checkout.status = "completed"
+      checkout.order = OrderConfirmation(
+          id=order_id,
+          permalink_url=f"https://example.com/order?id={order_id}",
+      )
 
-    self._orders[order_id] = checkout
-    # Clear the checkout after placing the order
-    del self._checkouts[checkout_id]
-    return checkout
+      self._orders[order_id] = checkout
+      # Clear the checkout after placing the order
+      del self._checkouts[checkout_id]
+      self._checkout_locks.pop(checkout_id, None)
+      self._line_item_indexes.pop(checkout_id, None)
+      return checkout
 
   def _get_fulfillment_options(self) -> list[FulfillmentOptionResponse]:
     """Returns a list of available fulfillment options."""
@@ -3,6 +3,9 @@
 from sqlalchemy import Column, String, Float, Integer, Text, DateTime, Boolean, ForeignKey, create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 import json
 import os
@@ -211,10 +214,23 @@ class DatabaseManager:
         from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
         from sqlalchemy.orm import sessionmaker
 
+        # Pool connections so concurrent requests don't queue behind one connection.
+        # In-memory SQLite databases are per-connection, so leave their pooling to SQLAlchemy.
+        engine_kwargs = {}
+        if make_url(self.database_url).database not in (None, "", ":memory:"):
+            engine_kwargs = {
+                "poolclass": AsyncAdaptedQueuePool,
+                "pool_size": 10,
+                "max_overflow": 20,
+                "pool_timeout": 30,
+                "pool_pre_ping": True,
+            }
+
         self.engine = create_async_engine(
             self.database_url,
             echo=False,
-            future=True
+            future=True,
+            **engine_kwargs
         )
         self.SessionLocal = sessionmaker(
             self.engine,
@@ -222,8 +238,9 @@ class DatabaseManager:
             expire_on_commit=False
         )
 
-    async def get_session(self):
-        """Get database session."""
+    @asynccontextmanager
+    async def session(self):
+        """Get database session (use as `async with db_manager.session() as session`)."""
         async with self.SessionLocal() as session:
             yield session
 
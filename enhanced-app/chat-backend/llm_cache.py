@@ -0,0 +1,265 @@
+"""
+LLM response cache for the chat agent.
+
+Two tiers:
+- Exact match: sha256 of the model name and serialized message list
+- Semantic fallback: cosine similarity between embeddings of past user messages
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Protocol, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EmbedFn = Callable[[str], Awaitable[List[float]]]
+
+
+class CacheBackend(Protocol):
+    """Storage backend for cached LLM responses."""
+
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        ...
+
+
+class InMemoryCacheBackend:
+    """LRU cache backed by an OrderedDict with per-entry expiry."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class RedisCacheBackend:
+    """Redis-backed cache so multiple chat workers share responses."""
+
+    def __init__(self, redis_url: str, prefix: str = "llm-cache:"):
+        # Optional dependency - only needed when LLM_CACHE_REDIS_URL is set
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(redis_url, decode_responses=True)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await self.client.set(self.prefix + key, value, ex=ttl)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class LLMCache:
+    """Exact-match LLM response cache with an optional embedding-similarity fallback."""
+
+    def __init__(
+        self,
+        backend: Optional[CacheBackend] = None,
+        embed_fn: Optional[EmbedFn] = None,
+        similarity_threshold: float = 0.95,
+        ttl: int = 3600,
+        max_semantic_entries: int = 512
+    ):
+        """
+        Initialize LLM cache.
+
+        Args:
+            backend: Storage backend (defaults to in-memory LRU)
+            embed_fn: Async function returning an embedding for a text; enables semantic lookups
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+            ttl: Time-to-live of cached responses in seconds
+            max_semantic_entries: Maximum number of embeddings kept for semantic lookups
+        """
+        self.backend = backend or InMemoryCacheBackend()
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        self.max_semantic_entries = max_semantic_entries
+        # Unit-length embeddings stored row-wise in a preallocated matrix (grown by doubling)
+        # so all similarities are computed with one matrix-vector product
+        self._emb: Optional[np.ndarray] = None
+        self._emb_keys: List[str] = []  # cache key of each row
+        self._emb_count = 0
+        # Query embeddings computed by a missed get(), reused by the following set()
+        self._pending_vecs: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    @staticmethod
+    def make_key(model: str, messages: List[Any]) -> str:
+        """Build the exact-match cache key for a model and LangChain message list."""
+        payload = json.dumps(
+            {"model": model, "messages": [(m.type, m.content) for m in messages]},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def get(self, key: str, query_text: Optional[str] = None) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Exact-match cache key
+            query_text: Text to embed for a semantic lookup on exact-match miss
+
+        Returns:
+            Cached response content or None
+        """
+        try:
+            cached = await self.backend.get(key)
+            if cached is not None:
+                logger.info("LLM cache hit (exact)")
+                return cached
+
+            if query_text is None or self.embed_fn is None or not self._emb_count:
+                return None
+
+            query_vec = self._normalize(await self.embed_fn(query_text))
+            self._remember_query_vec(key, query_vec)
+            sims = self._emb[:self._emb_count] @ query_vec
+            best = int(np.argmax(sims))
+            best_score = float(sims[best])
+
+            if best_score >= self.similarity_threshold:
+                cached = await self.backend.get(self._emb_keys[best])
+                if cached is not None:
+                    self._pending_vecs.pop(key, None)
+                    logger.info(f"LLM cache hit (semantic, similarity={best_score:.3f})")
+                    return cached
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {e}")
+
+        return None
+
+    async def set(self, key: str, value: str, query_text: Optional[str] = None):
+        """
+        Store a response.
+
+        Args:
+            key: Exact-match cache key
+            value: Response content
+            query_text: Text to embed so later similar queries can reuse this response
+        """
+        try:
+            await self.backend.set(key, value, ttl=self.ttl)
+
+            if query_text is not None and self.embed_fn is not None:
+                query_vec = self._pending_vecs.pop(key, None)
+                if query_vec is None:
+                    query_vec = self._normalize(await self.embed_fn(query_text))
+                self._add_embedding(query_vec, key)
+        except Exception as e:
+            logger.warning(f"LLM cache store failed: {e}")
+
+    def _remember_query_vec(self, key: str, vec: np.ndarray):
+        """Keep a lookup's embedding so storing the response doesn't embed the same text again."""
+        self._pending_vecs[key] = vec
+        while len(self._pending_vecs) > 64:  # lookups whose response was never stored
+            self._pending_vecs.popitem(last=False)
+
+    def _add_embedding(self, vec: np.ndarray, key: str):
+        """Append a unit embedding, dropping the oldest half once max_semantic_entries is reached."""
+        if self._emb is None or self._emb.shape[1] != vec.shape[0]:
+            # First entry (or the embedding model changed dimensions)
+            self._emb = np.empty((16, vec.shape[0]), dtype=np.float32)
+            self._emb_keys = []
+            self._emb_count = 0
+
+        if self._emb_count >= self.max_semantic_entries:
+            keep = self.max_semantic_entries // 2
+            self._emb[:keep] = self._emb[self._emb_count - keep:self._emb_count]
+            self._emb_keys = self._emb_keys[self._emb_count - keep:self._emb_count]
+            self._emb_count = keep
+        elif self._emb_count == self._emb.shape[0]:
+            grown = np.empty((min(self._emb.shape[0] * 2, self.max_semantic_entries), vec.shape[0]), dtype=np.float32)
+            grown[:self._emb_count] = self._emb[:self._emb_count]
+            self._emb = grown
+
+        self._emb[self._emb_count] = vec
+        self._emb_keys.append(key)
+        self._emb_count += 1
+
+    @staticmethod
+    def _normalize(vec: List[float]) -> np.ndarray:
+        arr = np.asarray(vec, dtype=np.float32)
+        norm = np.linalg.norm(arr)
+        return arr / norm if norm else arr
+
+    async def close(self):
+        """Release backend resources."""
+        close = getattr(self.backend, "close", None)
+        if close is not None:
+            await close()
+
+
+def create_llm_cache(ollama_url: str, client_kwargs: Optional[Dict[str, Any]] = None) -> Optional[LLMCache]:
+    """
+    Create the LLM cache from environment variables.
+    `client_kwargs` configures the HTTP client used for Ollama embedding requests.
+
+    - LLM_CACHE_ENABLED=true/false (default: true)
+    - LLM_CACHE_TTL=<seconds> (default: 3600)
+    - LLM_CACHE_MAX_ENTRIES=<count> (default: 1024, in-memory backend only)
+    - LLM_CACHE_REDIS_URL=<url> (optional, shares the cache across workers)
+    - OLLAMA_EMBED_MODEL=<model> (optional, enables semantic lookups, e.g. nomic-embed-text)
+    - LLM_CACHE_SIMILARITY=<0..1> (default: 0.95)
+    """
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() != "true":
+        logger.info("LLM cache disabled")
+        return None
+
+    redis_url = os.getenv("LLM_CACHE_REDIS_URL")
+    if redis_url:
+        backend = RedisCacheBackend(redis_url)
+    else:
+        backend = InMemoryCacheBackend(maxsize=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")))
+
+    embed_fn = None
+    embed_model = os.getenv("OLLAMA_EMBED_MODEL")
+    if embed_model:
+        from langchain_ollama import OllamaEmbeddings
+
+        embeddings = OllamaEmbeddings(
+            base_url=ollama_url,
+            model=embed_model,
+            client_kwargs=client_kwargs or {}
+        )
+        embed_fn = embeddings.aembed_query
+
+    logger.info(
+        f"LLM cache enabled (backend: {'redis' if redis_url else 'memory'}, "
+        f"semantic: {embed_model or 'disabled'})"
+    )
+    return LLMCache(
+        backend=backend,
+        embed_fn=embed_fn,
+        similarity_threshold=float(os.getenv("LLM_CACHE_SIMILARITY", "0.95")),
+        ttl=int(os.getenv("LLM_CACHE_TTL", "3600"))
+    )
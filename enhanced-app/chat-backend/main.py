@@ -6,6 +6,7 @@ Acts as Credentials Provider for AP2 payment protocol
 
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, EmailStr
 from typing import List, Optional, Dict, Any
 from contextlib import asynccontextmanager
@@ -159,7 +160,9 @@ async def lifespan(app: FastAPI):
     app.state.agent = EnhancedBusinessAgent(
         ollama_url=ollama_url,
         model_name=ollama_model,
-        merchant_url=merchant_url
+        merchant_url=merchant_url,
+        keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+        num_ctx=int(os.getenv("OLLAMA_NUM_CTX")) if os.getenv("OLLAMA_NUM_CTX") else None
     )
 
     # Initialize UCP client
@@ -229,7 +232,7 @@ def get_mastercard_client() -> MastercardClient:
 
 async def get_db() -> AsyncSession:
     """Get database session."""
-    async for session in db_manager.get_session():
+    async with db_manager.session() as session:
         yield session
 
 
@@ -249,6 +252,7 @@ async def root():
             "docs": "/docs",
             "api": {
                 "chat": "POST /api/chat",
+                "chat_stream": "POST /api/chat/stream",
                 "checkout": "POST /api/checkout",
                 "get_checkout": "GET /api/checkout/{checkout_id}",
                 "get_order": "GET /api/orders/{order_id}"
@@ -301,6 +305,26 @@ async def chat(
     )
 
 
+@app.post("/api/chat/stream")
+async def chat_stream(
+    message: ChatMessage,
+    agent: EnhancedBusinessAgent = Depends(get_agent)
+):
+    """
+    Stream the shopping assistant's reply as Server-Sent Events.
+    Each event is JSON: {"delta": ...} response chunks as they are generated,
+    then a final {"done": true, "status": ..., "products": [...]} event.
+    """
+    async def event_stream():
+        async for event in agent.stream_message(
+            message=message.message,
+            session_id=message.session_id
+        ):
+            yield f"data: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @app.post("/api/checkout", response_model=CheckoutResponse, status_code=201)
 async def create_checkout(
     checkout_request: CheckoutRequest,
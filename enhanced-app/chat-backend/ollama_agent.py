@@ -2,34 +2,60 @@
 
 from langchain_ollama import ChatOllama
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Literal, AsyncIterator
+import httpx
 import logging
+import random
+import re
 
 from ucp_client import UCPMerchantClient
+from llm_cache import LLMCache, create_llm_cache
 
 logger = logging.getLogger(__name__)
 
-
-class EnhancedBusinessAgent:
-    """Enhanced business agent using Ollama LLM with UCP merchant integration."""
-
-    def __init__(
-        self,
-        ollama_url: str = "http://host.docker.internal:11434",
-        model_name: str = "qwen2.5:latest",
-        merchant_url: str = "http://localhost:8451"
-    ):
-        self.llm = ChatOllama(
-            base_url=ollama_url,
-            model=model_name,
-            temperature=0.7,
-        )
-        self.ucp_client = UCPMerchantClient(merchant_url)
-        self.carts = {}  # In-memory cart storage: {session_id: [{product_id, name, price, quantity, sku}]}
-        self.checkouts = {}  # In-memory checkout sessions
-        self.orders = {}  # In-memory order history
-        self.promocode_asked = {}  # Track if promocode was asked for session: {session_id: bool}
-        self.system_prompt = """You are a helpful shopping assistant for an online store with a loyalty rewards program.
+# HTTP client settings for Ollama connections (passed through to httpx).
+# Chat turns are often more than httpx's default 5s keep-alive apart, so keep idle
+# connections open longer to avoid a new TCP handshake on every message.
+OLLAMA_CLIENT_KWARGS = {
+    "limits": httpx.Limits(max_keepalive_connections=20, max_connections=100, keepalive_expiry=300),
+}
+
+# Messages that are only a greeting, thanks or goodbye - answered without calling the LLM
+GREETING_RE = re.compile(
+    r"^\s*(?:(hi|hello|hey|hiya|good (?:morning|afternoon|evening))"
+    r"|(thanks|thank you|thx|ty)"
+    r"|(bye|goodbye|see you|see ya))"
+    r"(?:\s+(?:there|so much|a lot))?[\s!.,:)]*$",
+    re.IGNORECASE
+)
+
+# Intent keywords, matched as case-insensitive substrings in a single regex scan each
+ADD_KEYWORDS_RE = re.compile(r"add|put|place|get|buy|purchase|order|want", re.IGNORECASE)
+PRODUCT_KEYWORDS_RE = re.compile(r"cookie|chip|strawberr|bar|potato|oat|nutri", re.IGNORECASE)
+CART_CONTEXT_RE = re.compile(r"cart|basket", re.IGNORECASE)
+CHECKOUT_KEYWORDS_RE = re.compile(r"checkout|check out|pay|payment|complete order|finalize|proceed", re.IGNORECASE)
+CART_KEYWORDS_RE = re.compile(r"cart|basket|my order|what did i add|show me what", re.IGNORECASE)
+SEARCH_KEYWORDS_RE = re.compile(r"product|cookie|chip|strawberr|show|what|find|looking\s+for|search", re.IGNORECASE)
+
+GREETING_RESPONSES = [
+    "Hi there! 👋 I can help you find products, manage your cart, or check your loyalty rewards. What are you looking for today?",
+    "Hello! Looking for something tasty? Ask me about our cookies, chips, strawberries and more.",
+    "Hey! What can I help you shop for today?",
+]
+
+THANKS_RESPONSES = [
+    "You're welcome! Let me know if there's anything else I can help you find.",
+    "Happy to help! Anything else you'd like to shop for?",
+]
+
+GOODBYE_RESPONSES = [
+    "Goodbye! Thanks for shopping with us. 👋",
+    "See you soon! Your cart will be here when you come back.",
+]
+
+# Kept byte-identical across requests (per-call context goes in the HumanMessage) so
+# Ollama can reuse the cached prompt prefix instead of re-evaluating it every turn
+SYSTEM_PROMPT = """You are a helpful shopping assistant for an online store with a loyalty rewards program.
 
 You can help customers:
 - Search for products in our catalog
@@ -81,6 +107,55 @@ Keep responses concise when product cards will be shown.
 Proactively mention loyalty benefits when relevant (e.g., after checkout, or when users show interest in savings).
 """
 
+SYSTEM_MESSAGE = SystemMessage(content=SYSTEM_PROMPT)
+
+
+class EnhancedBusinessAgent:
+    """Enhanced business agent using Ollama LLM with UCP merchant integration."""
+
+    def __init__(
+        self,
+        ollama_url: str = "http://host.docker.internal:11434",
+        model_name: str = "qwen2.5:latest",
+        merchant_url: str = "http://localhost:8451",
+        keep_alive: str = "30m",
+        num_ctx: Optional[int] = None
+    ):
+        self.ollama_url = ollama_url
+        self.model_name = model_name
+        self.keep_alive = keep_alive
+        self.num_ctx = num_ctx
+        self._llm: Optional[ChatOllama] = None  # created on first use, see `llm`
+        self._llm_cache: Optional[LLMCache] = None  # created on first use, see `llm_cache`
+        self._llm_cache_created = False  # create_llm_cache returns None when disabled
+        self.ucp_client = UCPMerchantClient(merchant_url)
+        self.carts = {}  # In-memory cart storage: {session_id: [{product_id, name, price, quantity, sku}]}
+        self.checkouts = {}  # In-memory checkout sessions
+        self.orders = {}  # In-memory order history
+        self.promocode_asked = {}  # Track if promocode was asked for session: {session_id: bool}
+
+    @property
+    def llm(self) -> ChatOllama:
+        """Chat model, created on first use so workers that never chat don't build it."""
+        if self._llm is None:
+            self._llm = ChatOllama(
+                base_url=self.ollama_url,
+                model=self.model_name,
+                temperature=0.7,
+                keep_alive=self.keep_alive,  # keep the model (and its prompt cache) loaded between turns
+                num_ctx=self.num_ctx,
+                client_kwargs=OLLAMA_CLIENT_KWARGS,
+            )
+        return self._llm
+
+    @property
+    def llm_cache(self) -> Optional[LLMCache]:
+        """Response cache, created on first use along with its embedding client (None when disabled)."""
+        if not self._llm_cache_created:
+            self._llm_cache = create_llm_cache(self.ollama_url, client_kwargs=OLLAMA_CLIENT_KWARGS)
+            self._llm_cache_created = True
+        return self._llm_cache
+
     async def initialize(self):
         """Initialize the agent by discovering UCP capabilities."""
         try:
@@ -187,6 +262,21 @@ Proactively mention loyalty benefits when relevant (e.g., after checkout, or whe
         """Get the promocode question prompt."""
         return "\n\n💳 Do you have a promocode or voucher you'd like to apply to your order? If yes, please provide the code. If not, just let me know and we'll proceed with checkout."
 
+    def _classify(self, message: str) -> Literal["greeting", "other"]:
+        """Cheaply classify a message so trivial ones can skip the LLM."""
+        if GREETING_RE.match(message):
+            return "greeting"
+        return "other"
+
+    def _greeting_response(self, message: str) -> str:
+        """Pick a canned reply for a greeting, thanks or goodbye message."""
+        match = GREETING_RE.match(message)
+        if match.group(2):
+            return random.choice(THANKS_RESPONSES)
+        if match.group(3):
+            return random.choice(GOODBYE_RESPONSES)
+        return random.choice(GREETING_RESPONSES)
+
     async def process_message(
         self,
         message: str,
@@ -204,21 +294,65 @@ Proactively mention loyalty benefits when relevant (e.g., after checkout, or whe
         Returns:
             Response dict with output and metadata
         """
+        parts = []
+        async for event in self.stream_message(message, session_id, chat_history):
+            if not event.get("done"):
+                parts.append(event["delta"])
+                continue
+
+            if event["status"] == "error":
+                return {
+                    "output": event["error"],
+                    "session_id": session_id,
+                    "status": "error"
+                }
+
+            response_data = {
+                "output": "".join(parts),
+                "session_id": session_id,
+                "status": event["status"]
+            }
+            if "products" in event:
+                response_data["products"] = event["products"]
+            return response_data
+
+    async def stream_message(
+        self,
+        message: str,
+        session_id: str = "default",
+        chat_history: Optional[List] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a user message and stream the agent response as it is generated.
+
+        Args:
+            message: User input message
+            session_id: Session identifier
+            chat_history: Previous conversation history
+
+        Yields:
+            {"delta": text, "session_id": ...} chunks of the response, then a final
+            {"done": True, "session_id": ..., "status": ...} event with "products"
+            (for product searches) or "error" (on failure)
+        """
         try:
+            # Answer plain greetings directly - no retrieval or LLM call needed
+            if self._classify(message) == "greeting":
+                yield {"delta": self._greeting_response(message), "session_id": session_id}
+                yield {"done": True, "session_id": session_id, "status": "success"}
+                return
+
             # Check if user is trying to add to cart
             msg_lower = message.lower()
 
             # Direct add keywords
-            add_keywords = ['add', 'put', 'place', 'get', 'buy', 'purchase', 'order', 'want']
-            has_add_keyword = any(keyword in msg_lower for keyword in add_keywords)
+            has_add_keyword = bool(ADD_KEYWORDS_RE.search(message))
 
             # Product mentions
-            product_keywords = ['cookie', 'chip', 'strawberr', 'bar', 'potato', 'oat', 'nutri']
-            has_product_mention = any(keyword in msg_lower for keyword in product_keywords)
+            has_product_mention = bool(PRODUCT_KEYWORDS_RE.search(message))
 
             # Cart/purchase context
-            cart_context = ['cart', 'basket']
-            has_cart_context = any(keyword in msg_lower for keyword in cart_context)
+            has_cart_context = bool(CART_CONTEXT_RE.search(message))
 
             # Check for affirmative responses that might be confirming an add-to-cart action
             is_affirmative = msg_lower.strip() in ['yes', 'yeah', 'yep', 'sure', 'ok', 'okay', 'yup']
@@ -231,16 +365,13 @@ Proactively mention loyalty benefits when relevant (e.g., after checkout, or whe
             )
 
             # Check if user wants to checkout
-            checkout_keywords = ['checkout', 'check out', 'pay', 'payment', 'complete order', 'finalize', 'proceed']
-            is_checkout_intent = any(keyword in message.lower() for keyword in checkout_keywords)
+            is_checkout_intent = bool(CHECKOUT_KEYWORDS_RE.search(message))
 
             # Check if user is asking about cart
-            cart_keywords = ['cart', 'basket', 'my order', 'what did i add', 'show me what']
-            is_cart_query = any(keyword in message.lower() for keyword in cart_keywords) and not is_add_to_cart and not is_checkout_intent
+            is_cart_query = bool(CART_KEYWORDS_RE.search(message)) and not is_add_to_cart and not is_checkout_intent
 
             # Check if user is asking about products
-            search_keywords = ['product', 'cookie', 'chip', 'strawberr', 'show', 'what', 'find', 'looking for', 'search']
-            should_search = any(keyword in message.lower() for keyword in search_keywords) and not is_cart_query and not is_add_to_cart and not is_checkout_intent
+            should_search = bool(SEARCH_KEYWORDS_RE.search(message)) and not is_cart_query and not is_add_to_cart and not is_checkout_intent
 
             context = ""
             cart_action_result = None
@@ -324,7 +455,7 @@ Proactively mention loyalty benefits when relevant (e.g., after checkout, or whe
                 # Extract potential search query from the message
                 search_query = None
                 for keyword in ['cookie', 'chip', 'strawberr', 'bar', 'snack', 'fruit']:
-                    if keyword in message.lower():
+                    if keyword in msg_lower:
                         search_query = keyword
                         break
 
@@ -333,7 +464,7 @@ Proactively mention loyalty benefits when relevant (e.g., after checkout, or whe
                     context += f"\n\nFound {len(products)} products matching the search. Product cards will be displayed automatically - just provide a brief friendly message.\n"
 
             # Build conversation messages
-            messages = [SystemMessage(content=self.system_prompt)]
+            messages = [SYSTEM_MESSAGE]
 
             if chat_history:
                 messages.extend(chat_history)
@@ -350,33 +481,54 @@ Proactively mention loyalty benefits when relevant (e.g., after checkout, or whe
 
             messages.append(HumanMessage(content=user_message))
 
-            # Get response from LLM
-            response = await self.llm.ainvoke(messages)
-
-            # Include product data if this was a search query
-            response_data = {
-                "output": response.content,
-                "session_id": session_id,
-                "status": "success"
-            }
+            # Stream response from LLM (or the cache)
+            output = None
+            cache_key = None
+            # Only stateless queries may reuse a semantically similar response;
+            # cart and checkout replies depend on the session's cart contents
+            semantic_text = None
+            if not (chat_history or cart_action_result or is_cart_query or is_checkout_intent):
+                semantic_text = user_message
+
+            if self.llm_cache:
+                cache_key = LLMCache.make_key(self.model_name, messages)
+                output = await self.llm_cache.get(cache_key, query_text=semantic_text)
+
+            if output is not None:
+                yield {"delta": output, "session_id": session_id}
+            else:
+                chunks = []
+                async for chunk in self.llm.astream(messages):
+                    if chunk.content:
+                        chunks.append(chunk.content)
+                        yield {"delta": chunk.content, "session_id": session_id}
+                output = "".join(chunks)
+                # Don't cache an empty generation for the whole TTL
+                if self.llm_cache and output:
+                    await self.llm_cache.set(cache_key, output, query_text=semantic_text)
+
+            final_event = {"done": True, "session_id": session_id, "status": "success"}
 
             # If we searched for products, include them in the response
             if should_search and products:
                 logger.info(f"Including {len(products)} products in response for session {session_id}")
-                response_data["products"] = products
+                final_event["products"] = products
             else:
                 logger.info(f"Not including products: should_search={should_search}, products_count={len(products) if products else 0}")
 
-            return response_data
+            yield final_event
 
         except Exception as e:
             logger.error(f"Error processing message: {e}")
-            return {
-                "output": f"I apologize, but I encountered an error: {str(e)}. Please try again.",
+            yield {
+                "done": True,
                 "session_id": session_id,
-                "status": "error"
+                "status": "error",
+                "error": f"I apologize, but I encountered an error: {str(e)}. Please try again."
             }
 
     async def cleanup(self):
         """Cleanup resources."""
         await self.ucp_client.close()
+        if self._llm_cache:
+            await self._llm_cache.close()
@@ -3,12 +3,27 @@ UCP Client for communicating with Merchant Backend
 """
 
 import httpx
+import json
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1024)
+def _first_image_url(image_url_json: str) -> Optional[str]:
+    """
+    First URL of a JSON-encoded image URL array.
+    Cached because the same products (and strings) come back on every search.
+    """
+    try:
+        urls = json.loads(image_url_json)
+        return urls[0] if urls else None
+    except (json.JSONDecodeError, IndexError, KeyError, TypeError):
+        return None
+
+
 class UCPMerchantClient:
     """Client for interacting with UCP-compliant merchant backend."""
 
@@ -99,12 +114,7 @@ class UCPMerchantClient:
                 # Parse image_url from JSON array string
                 image_url = item.get("image_url")
                 if image_url and isinstance(image_url, str):
-                    try:
-                        import json
-                        urls = json.loads(image_url)
-                        image_url = urls[0] if urls else None
-                    except (json.JSONDecodeError, IndexError):
-                        image_url = None
+                    image_url = _first_image_url(image_url)
 
                 products.append({
                     "id": item["id"],
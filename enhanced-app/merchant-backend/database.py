@@ -3,9 +3,15 @@
 from sqlalchemy import Column, String, Float, Integer, Text, DateTime, Boolean, ForeignKey, create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from contextlib import asynccontextmanager
 from datetime import datetime
 import json
 import os
+import logging
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
@@ -366,6 +372,28 @@ class Promocode(Base):
         }
 
 
+# External-content FTS5 index over products(name, description, category)
+PRODUCT_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description, category, content='products', content_rowid='rowid'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description, category)
+        VALUES (new.rowid, new.name, new.description, new.category);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description, category)
+        VALUES ('delete', old.rowid, old.name, old.description, old.category);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description, category)
+        VALUES ('delete', old.rowid, old.name, old.description, old.category);
+        INSERT INTO products_fts(rowid, name, description, category)
+        VALUES (new.rowid, new.name, new.description, new.category);
+    END""",
+]
+
+
 class DatabaseManager:
     """Manages database connections and operations."""
 
@@ -373,6 +401,20 @@ class DatabaseManager:
         self.database_url = database_url
         self.engine = None
         self.SessionLocal = None
+        self.fts_enabled = False  # products_fts full-text index available (SQLite only)
+
+    def _init_product_fts(self, sync_engine) -> bool:
+        """Create the products_fts FTS5 index and triggers that keep it in sync with products."""
+        try:
+            with sync_engine.begin() as conn:
+                for statement in PRODUCT_FTS_DDL:
+                    conn.exec_driver_sql(statement)
+                # Index rows that existed before the triggers did
+                conn.exec_driver_sql("INSERT INTO products_fts(products_fts) VALUES('rebuild')")
+            return True
+        except Exception as e:
+            logger.warning(f"SQLite FTS5 unavailable, product search will use LIKE: {e}")
+            return False
 
     def init_db(self):
         """Initialize database connection and create tables."""
@@ -380,15 +422,29 @@ class DatabaseManager:
         sync_url = self.database_url.replace("+aiosqlite", "")
         sync_engine = create_engine(sync_url, connect_args={"check_same_thread": False})
         Base.metadata.create_all(bind=sync_engine)
+        self.fts_enabled = sync_engine.dialect.name == "sqlite" and self._init_product_fts(sync_engine)
 
         # Create async session maker
         from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
         from sqlalchemy.orm import sessionmaker
 
+        # Pool connections so concurrent requests don't queue behind one connection.
+        # In-memory SQLite databases are per-connection, so leave their pooling to SQLAlchemy.
+        engine_kwargs = {}
+        if make_url(self.database_url).database not in (None, "", ":memory:"):
+            engine_kwargs = {
+                "poolclass": AsyncAdaptedQueuePool,
+                "pool_size": 10,
+                "max_overflow": 20,
+                "pool_timeout": 30,
+                "pool_pre_ping": True,
+            }
+
         self.engine = create_async_engine(
             self.database_url,
             echo=False,
-            future=True
+            future=True,
+            **engine_kwargs
         )
         self.SessionLocal = sessionmaker(
             self.engine,
@@ -396,8 +452,9 @@ class DatabaseManager:
             expire_on_commit=False
         )
 
-    async def get_session(self):
-        """Get database session."""
+    @asynccontextmanager
+    async def session(self):
+        """Get database session (use as `async with db_manager.session() as session`)."""
         async with self.SessionLocal() as session:
             yield session
 
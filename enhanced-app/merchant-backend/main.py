@@ -16,6 +16,7 @@ from datetime import datetime
 from dotenv import load_dotenv
 
 from database import db_manager, Product, UCPRequestLog, AP2RequestLog, Promocode
+from product_catalog import product_catalog, search_products_db
 from sqlalchemy import select, desc
 from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
@@ -145,7 +146,7 @@ async def lifespan(app: FastAPI):
 
 async def seed_initial_data():
     """Seed database with initial products and promocodes if empty."""
-    async for session in db_manager.get_session():
+    async with db_manager.session() as session:
         # Seed products
         result = await session.execute(select(Product))
         existing_products = result.scalars().first()
@@ -343,7 +344,7 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
     async def _log_ucp_request(self, request: Request, response: Response, request_body, response_body, duration_ms):
         """Log UCP API request."""
         try:
-            async for session in db_manager.get_session():
+            async with db_manager.session() as session:
                 log_entry = UCPRequestLog(
                     id=str(uuid.uuid4()),
                     endpoint=request.url.path,
@@ -388,7 +389,7 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
                 if response_body.get("payment_status"):
                     payment_status = response_body["payment_status"].get("status")
 
-            async for session in db_manager.get_session():
+            async with db_manager.session() as session:
                 log_entry = AP2RequestLog(
                     id=str(uuid.uuid4()),
                     endpoint=request.url.path,
@@ -421,7 +422,7 @@ app.add_middleware(RequestLoggingMiddleware)
 
 async def get_db() -> AsyncSession:
     """Get database session."""
-    async for session in db_manager.get_session():
+    async with db_manager.session() as session:
         yield session
 
 
@@ -556,38 +557,28 @@ async def ucp_search_products(
     request: Request,
     q: Optional[str] = None,
     category: Optional[str] = None,
-    limit: int = 10,
-    session: AsyncSession = Depends(get_db)
+    limit: int = 10
 ):
     """
     UCP-compliant product search endpoint.
     This endpoint can be discovered and called by UCP clients.
+    Served from the in-process product catalog, reloaded from the database when stale.
     """
-    query = select(Product).where(Product.is_active == True)
-
-    if q:
-        search_term = f"%{q.lower()}%"
-        query = query.where(
-            (Product.name.ilike(search_term)) |
-            (Product.description.ilike(search_term)) |
-            (Product.category.ilike(search_term))
-        )
-
-    if category:
-        query = query.where(Product.category.ilike(f"%{category}%"))
-
-    query = query.limit(limit)
-    result = await session.execute(query)
-    products = result.scalars().all()
+    if product_catalog.enabled:
+        await product_catalog.ensure_loaded()
+        products = product_catalog.search(query=q, category=category, limit=limit)
+    else:
+        async with db_manager.session() as session:
+            products = await search_products_db(session, query=q, category=category, limit=limit)
 
     # Convert to UCP format (prices in cents)
     items = [
         UCPProductItem(
-            id=p.id,
-            title=p.name,
-            price=int(p.price * 100),  # Convert to cents
-            image_url=p.image_url,
-            description=p.description
+            id=p["id"],
+            title=p["name"],
+            price=int(p["price"] * 100),  # Convert to cents
+            image_url=p["image_url"],
+            description=p["description"]
         )
         for p in products
     ]
@@ -720,6 +711,7 @@ async def create_product(
     session.add(db_product)
     await session.commit()
     await session.refresh(db_product)
+    product_catalog.invalidate()
 
     return ProductResponse(
         id=db_product.id,
@@ -770,6 +762,7 @@ async def update_product(
 
     await session.commit()
     await session.refresh(db_product)
+    product_catalog.invalidate()
 
     return ProductResponse(
         id=db_product.id,
@@ -814,6 +807,7 @@ async def delete_product(
         db_product.updated_at = datetime.utcnow()
 
     await session.commit()
+    product_catalog.invalidate()
 
     return {"message": "Product deleted successfully", "product_id": product_id}
 
@@ -1130,6 +1124,14 @@ async def create_checkout_session(
     """
     session_id = f"cs_{uuid.uuid4().hex[:16]}"
 
+    # Price line items from the catalog (one batched lookup) rather than trusting client prices
+    prices = await product_catalog.prices(session, [item.id for item in checkout.line_items])
+    unknown = [item.id for item in checkout.line_items if item.id not in prices]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown or inactive products: {', '.join(unknown)}")
+    for item in checkout.line_items:
+        item.price = prices[item.id]
+
     # Calculate subtotal
     subtotal = sum(item.price * item.quantity for item in checkout.line_items)
 
@@ -3,13 +3,15 @@ Merchant Payment Agent - Ollama-based AP2 payment processor
 Integrated within merchant backend, uses same Ollama instance as chat backend.
 """
 
-import uuid
 import random
+import secrets
 import os
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Any, Optional
 import logging
 
+from cachetools import TTLCache
+
 from ap2_types import (
     PaymentMandate,
     PaymentReceipt,
@@ -39,13 +41,16 @@ class MerchantPaymentAgent:
         """
         self.ollama_url = ollama_url
         self.model_name = model_name
-        self.pending_otps: Dict[str, str] = {}  # mandate_id -> otp
+        # mandate_id -> otp; bounded, and unverified OTPs expire after 5 minutes
+        self.pending_otps: TTLCache = TTLCache(maxsize=10_000, ttl=300)
 
         # OTP configuration - can be enabled/disabled via environment variable
         # Set ENABLE_OTP_CHALLENGE=true to enable OTP for high-risk transactions
         # Default: false (disabled) since passkeys provide sufficient security
         self.otp_enabled = os.getenv("ENABLE_OTP_CHALLENGE", "false").lower() == "true"
         self.otp_amount_threshold = float(os.getenv("OTP_AMOUNT_THRESHOLD", "100.0"))
+        # Set OTP_DEMO_MODE=false to generate random OTPs instead of the fixed demo code
+        self.otp_demo_mode = os.getenv("OTP_DEMO_MODE", "true").lower() == "true"
 
         logger.info(f"Merchant Payment Agent initialized (model: {model_name}, OTP: {'enabled' if self.otp_enabled else 'disabled'})")
 
@@ -61,11 +66,14 @@ class MerchantPaymentAgent:
         Returns:
             True if token is valid (not expired), False otherwise
         """
+        contents = mandate.payment_mandate_contents
+        mandate_id = contents.payment_mandate_id
+
         # Extract token expiry from payment response details
-        token_expiry_str = mandate.payment_mandate_contents.payment_response.details.get("token_expiry")
+        token_expiry_str = contents.payment_response.details.get("token_expiry")
 
         if not token_expiry_str:
-            logger.warning(f"Mandate {mandate.payment_mandate_contents.payment_mandate_id} missing token_expiry")
+            logger.warning(f"Mandate {mandate_id} missing token_expiry")
             # For backward compatibility, accept mandates without expiry
             return True
 
@@ -83,14 +91,14 @@ class MerchantPaymentAgent:
             # Check if token has expired
             now = datetime.utcnow()
             if now > expiry_date:
-                logger.warning(f"Mandate {mandate.payment_mandate_contents.payment_mandate_id} network token expired at {token_expiry_str}")
+                logger.warning(f"Mandate {mandate_id} network token expired at {token_expiry_str}")
                 return False
 
-            logger.info(f"Mandate {mandate.payment_mandate_contents.payment_mandate_id} network token valid until {token_expiry_str}")
+            logger.info(f"Mandate {mandate_id} network token valid until {token_expiry_str}")
             return True
 
         except Exception as e:
-            logger.error(f"Failed to parse network token expiry for mandate {mandate.payment_mandate_contents.payment_mandate_id}: {e}")
+            logger.error(f"Failed to parse network token expiry for mandate {mandate_id}: {e}")
             # For backward compatibility, accept if parsing fails
             return True
 
@@ -100,17 +108,20 @@ class MerchantPaymentAgent:
         In production, this would verify the WebAuthn signature.
         For demo, we check if signature exists.
         """
-        if not mandate.user_authorization:
-            logger.warning(f"Mandate {mandate.payment_mandate_contents.payment_mandate_id} missing signature")
+        mandate_id = mandate.payment_mandate_contents.payment_mandate_id
+        signature = mandate.user_authorization
+
+        if not signature:
+            logger.warning(f"Mandate {mandate_id} missing signature")
             return False
 
         # In production: verify signature using public key from consumer
         # For demo: accept if signature exists and is non-empty
-        if len(mandate.user_authorization) < 10:
-            logger.warning(f"Mandate {mandate.payment_mandate_contents.payment_mandate_id} has invalid signature")
+        if len(signature) < 10:
+            logger.warning(f"Mandate {mandate_id} has invalid signature")
             return False
 
-        logger.info(f"Mandate {mandate.payment_mandate_contents.payment_mandate_id} signature validated")
+        logger.info(f"Mandate {mandate_id} signature validated")
         return True
 
     def should_raise_otp_challenge(self, mandate: PaymentMandate) -> bool:
@@ -132,30 +143,38 @@ class MerchantPaymentAgent:
         - High-value transactions (configurable threshold)
         - Extra risk management layer
         """
+        contents = mandate.payment_mandate_contents
+        mandate_id = contents.payment_mandate_id
+
         # Check if OTP is enabled
         if not self.otp_enabled:
-            logger.info(f"OTP disabled for mandate {mandate.payment_mandate_contents.payment_mandate_id}")
+            logger.info(f"OTP disabled for mandate {mandate_id}")
             return False
 
         # OTP enabled - check amount threshold
-        amount = mandate.payment_mandate_contents.payment_details_total.amount.value
+        amount = contents.payment_details_total.amount.value
 
         if amount > self.otp_amount_threshold:
-            logger.info(f"OTP challenge triggered for mandate {mandate.payment_mandate_contents.payment_mandate_id} (amount: ${amount} > threshold: ${self.otp_amount_threshold})")
+            logger.info(f"OTP challenge triggered for mandate {mandate_id} (amount: ${amount} > threshold: ${self.otp_amount_threshold})")
             return True
 
-        logger.info(f"No OTP challenge for mandate {mandate.payment_mandate_contents.payment_mandate_id} (amount: ${amount} <= threshold: ${self.otp_amount_threshold})")
+        logger.info(f"No OTP challenge for mandate {mandate_id} (amount: ${amount} <= threshold: ${self.otp_amount_threshold})")
         return False
 
     def generate_otp(self, mandate_id: str) -> str:
         """
         Generate OTP for payment verification.
-        For demo purposes, always returns 123456.
-        In production, this would generate a random OTP and send via SMS/email.
+        In demo mode (default), always returns 123456.
+        Otherwise generates a cryptographically random 6-digit OTP;
+        in production this would be sent via SMS/email.
         """
-        otp = '123456'  # Fixed OTP for demo purposes
+        if self.otp_demo_mode:
+            otp = '123456'  # Fixed OTP for demo purposes
+            logger.info(f"Generated OTP for mandate {mandate_id}: {otp} (demo mode)")
+        else:
+            otp = f"{secrets.randbelow(1_000_000):06d}"
+            logger.info(f"Generated OTP for mandate {mandate_id}")
         self.pending_otps[mandate_id] = otp
-        logger.info(f"Generated OTP for mandate {mandate_id}: {otp} (demo mode)")
         return otp
 
     def verify_otp(self, mandate_id: str, otp_code: str) -> bool:
@@ -166,9 +185,11 @@ class MerchantPaymentAgent:
             logger.warning(f"No OTP found for mandate {mandate_id}")
             return False
 
-        if otp_code == expected_otp:
-            # Remove OTP after successful verification
-            del self.pending_otps[mandate_id]
+        # Constant-time comparison to avoid leaking the OTP through timing
+        if secrets.compare_digest(otp_code.encode(), expected_otp.encode()):
+            # Remove OTP after successful verification (pop: TTLCache's del raises
+            # KeyError if the entry expired since the lookup above)
+            self.pending_otps.pop(mandate_id, None)
             logger.info(f"OTP verified successfully for mandate {mandate_id}")
             return True
 
@@ -185,15 +206,18 @@ class MerchantPaymentAgent:
         3. Process payment (simulate)
         4. Return receipt
         """
-        mandate_id = mandate.payment_mandate_contents.payment_mandate_id
+        contents = mandate.payment_mandate_contents
+        mandate_id = contents.payment_mandate_id
+        amount = contents.payment_details_total.amount
+        timestamp = datetime.utcnow().isoformat()
 
         # Validate signature
         if not self.validate_mandate_signature(mandate):
             return PaymentReceipt(
                 payment_mandate_id=mandate_id,
-                timestamp=datetime.utcnow().isoformat(),
-                payment_id=f"ERR-{uuid.uuid4().hex[:8]}",
-                amount=mandate.payment_mandate_contents.payment_details_total.amount,
+                timestamp=timestamp,
+                payment_id=f"ERR-{secrets.token_hex(4)}",
+                amount=amount,
                 payment_status=PaymentReceiptError(
                     error_message="Invalid mandate signature"
                 )
@@ -203,9 +227,9 @@ class MerchantPaymentAgent:
         if not self.validate_token_expiry(mandate):
             return PaymentReceipt(
                 payment_mandate_id=mandate_id,
-                timestamp=datetime.utcnow().isoformat(),
-                payment_id=f"ERR-{uuid.uuid4().hex[:8]}",
-                amount=mandate.payment_mandate_contents.payment_details_total.amount,
+                timestamp=timestamp,
+                payment_id=f"ERR-{secrets.token_hex(4)}",
+                amount=amount,
                 payment_status=PaymentReceiptError(
                     error_message="Payment token expired. Please retry the transaction."
                 )
@@ -213,10 +237,12 @@ class MerchantPaymentAgent:
 
         # Simulate payment processing
         # In production: call actual payment gateway
-        payment_id = f"PAY-{uuid.uuid4().hex[:12].upper()}"
-        merchant_confirmation = f"MCH-{uuid.uuid4().hex[:8].upper()}"
-        psp_confirmation = f"PSP-{uuid.uuid4().hex[:8].upper()}"
-        network_confirmation = f"NET-{uuid.uuid4().hex[:8].upper()}"
+        # One random buffer sliced into all four IDs (12 + 8 + 8 + 8 hex chars)
+        buf = secrets.token_hex(18).upper()
+        payment_id = f"PAY-{buf[0:12]}"
+        merchant_confirmation = f"MCH-{buf[12:20]}"
+        psp_confirmation = f"PSP-{buf[20:28]}"
+        network_confirmation = f"NET-{buf[28:36]}"
 
         logger.info(f"Processing payment for mandate {mandate_id}: {payment_id}")
 
@@ -224,17 +250,17 @@ class MerchantPaymentAgent:
         if random.random() < 0.95:
             receipt = PaymentReceipt(
                 payment_mandate_id=mandate_id,
-                timestamp=datetime.utcnow().isoformat(),
+                timestamp=timestamp,
                 payment_id=payment_id,
-                amount=mandate.payment_mandate_contents.payment_details_total.amount,
+                amount=amount,
                 payment_status=PaymentReceiptSuccess(
                     merchant_confirmation_id=merchant_confirmation,
                     psp_confirmation_id=psp_confirmation,
                     network_confirmation_id=network_confirmation
                 ),
                 payment_method_details={
-                    "method": mandate.payment_mandate_contents.payment_response.method_name,
-                    "payer_email": mandate.payment_mandate_contents.payment_response.payer_email
+                    "method": contents.payment_response.method_name,
+                    "payer_email": contents.payment_response.payer_email
                 }
             )
             logger.info(f"Payment successful: {payment_id}")
@@ -242,9 +268,9 @@ class MerchantPaymentAgent:
             # Simulate failure
             receipt = PaymentReceipt(
                 payment_mandate_id=mandate_id,
-                timestamp=datetime.utcnow().isoformat(),
+                timestamp=timestamp,
                 payment_id=payment_id,
-                amount=mandate.payment_mandate_contents.payment_details_total.amount,
+                amount=amount,
                 payment_status=PaymentReceiptFailure(
                     failure_message="Payment declined by issuing bank"
                 )
@@ -255,12 +281,13 @@ class MerchantPaymentAgent:
 
     def create_otp_challenge(self, mandate: PaymentMandate) -> OTPChallenge:
         """Create OTP challenge for mandate."""
-        mandate_id = mandate.payment_mandate_contents.payment_mandate_id
+        contents = mandate.payment_mandate_contents
+        mandate_id = contents.payment_mandate_id
         otp = self.generate_otp(mandate_id)
 
         # In production: send OTP via SMS/email
         # For demo: just log it
-        payer_email = mandate.payment_mandate_contents.payment_response.payer_email
+        payer_email = contents.payment_response.payer_email
 
         return OTPChallenge(
             payment_mandate_id=mandate_id,
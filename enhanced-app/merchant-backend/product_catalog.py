@@ -0,0 +1,259 @@
+"""
+In-process product catalog for UCP product search.
+Keeps a snapshot of active products plus an inverted token index so searches
+are served from memory instead of running ILIKE scans on every request.
+"""
+
+import asyncio
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+import logging
+
+import numpy as np
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import db_manager, Product
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Product fields kept in the catalog and returned in search results
+CATALOG_COLUMNS = (
+    "id", "sku", "name", "description", "price", "currency", "category", "brand", "image_url",
+)
+
+
+def _product_row(p: Product) -> Dict[str, Any]:
+    """Plain-dict view of a product used for search results."""
+    return {column: getattr(p, column) for column in CATALOG_COLUMNS}
+
+
+class ProductCatalog:
+    """
+    Cached snapshot of active products, refreshed every `ttl` seconds or on invalidation.
+
+    Stored column-wise (one list per field, prices as a NumPy array) so searches
+    and price lookups work on row positions; dicts are only built for the rows
+    actually returned.
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        """
+        Initialize product catalog.
+
+        Args:
+            ttl: Seconds before the snapshot is reloaded from the database
+        """
+        self.ttl = ttl
+        self._columns: Dict[str, List[Any]] = {column: [] for column in CATALOG_COLUMNS}
+        self._prices: np.ndarray = np.empty(0, dtype=np.float64)
+        self._search_fields: List[Tuple[str, str, str]] = []  # lowercased name, description, category
+        self._by_id: Dict[str, int] = {}  # product id -> row position
+        self._by_token: Dict[str, Set[int]] = {}  # token -> row positions
+        self._token_matches: Dict[str, Set[int]] = {}  # query token -> row positions (memoized)
+        self._loaded_at: Optional[float] = None  # None: never loaded or invalidated
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether searches are served from the snapshot (CATALOG_TTL_SECONDS > 0)."""
+        return self.ttl > 0
+
+    def invalidate(self):
+        """Force a reload on the next search (call after product changes)."""
+        self._loaded_at = None
+
+    def _is_stale(self, ttl: float) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > ttl
+
+    async def ensure_loaded(self, ttl: Optional[float] = None):
+        """Load the catalog from the database if it is missing or stale."""
+        ttl = self.ttl if ttl is None else ttl
+        if not self._is_stale(ttl):
+            return
+
+        async with self._lock:
+            # Another request may have reloaded while we waited for the lock
+            if self._is_stale(ttl):
+                await self._load()
+
+    async def _load(self):
+        async with db_manager.session() as session:
+            result = await session.execute(
+                select(*(getattr(Product, column) for column in CATALOG_COLUMNS))
+                .where(Product.is_active == True)
+            )
+            rows = result.all()
+
+        # Transpose rows into one list per column
+        columns = {column: [] for column in CATALOG_COLUMNS}
+        for column, values in zip(CATALOG_COLUMNS, zip(*rows)):
+            columns[column] = list(values)
+
+        # Lowercased search fields, matching the ILIKE columns
+        search_fields = [
+            ((name or "").lower(), (description or "").lower(), (category or "").lower())
+            for name, description, category in zip(
+                columns["name"], columns["description"], columns["category"]
+            )
+        ]
+
+        by_token: Dict[str, Set[int]] = {}
+        for position, fields in enumerate(search_fields):
+            for token in TOKEN_RE.findall(" ".join(fields)):
+                by_token.setdefault(token, set()).add(position)
+
+        self._columns = columns
+        self._prices = np.asarray(columns["price"], dtype=np.float64)
+        self._search_fields = search_fields
+        self._by_id = {product_id: position for position, product_id in enumerate(columns["id"])}
+        self._by_token = by_token
+        self._token_matches = {}
+        self._loaded_at = time.monotonic()
+        logger.info(f"Product catalog loaded: {len(rows)} products, {len(by_token)} tokens")
+
+    def to_dicts(self, positions: List[int]) -> List[Dict[str, Any]]:
+        """Build product rows for the given positions (only at the API boundary)."""
+        if not positions:
+            return []
+        values = [
+            self._prices[positions].tolist() if column == "price"
+            else [self._columns[column][i] for i in positions]
+            for column in CATALOG_COLUMNS
+        ]
+        return [dict(zip(CATALOG_COLUMNS, row)) for row in zip(*values)]
+
+    async def prices(self, session: AsyncSession, ids: List[str]) -> Dict[str, float]:
+        """
+        Current prices for the given product ids.
+
+        Served from the snapshot; ids not in it (e.g. the catalog is disabled or
+        not yet reloaded) are fetched with a single batched query. Inactive
+        products are never priced.
+
+        Args:
+            session: Database session for the batched lookup
+            ids: Product ids
+
+        Returns:
+            Mapping of product id to price (unknown and inactive ids are omitted)
+        """
+        prices: Dict[str, float] = {}
+        if self.enabled:
+            await self.ensure_loaded()
+            found = [(product_id, self._by_id[product_id]) for product_id in ids if product_id in self._by_id]
+            if found:
+                found_ids, positions = zip(*found)
+                prices.update(zip(found_ids, self._prices[list(positions)].tolist()))
+
+        missing = {product_id for product_id in ids if product_id not in prices}
+        if missing:
+            result = await session.execute(
+                select(Product.id, Product.price)
+                .where(Product.id.in_(missing), Product.is_active == True)
+            )
+            prices.update({product_id: price for product_id, price in result.all()})
+
+        return prices
+
+    def _matches_for_token(self, token: str) -> Set[int]:
+        """Row positions of products having an indexed token that contains `token` (substring semantics)."""
+        matches = self._token_matches.get(token)
+        if matches is None:
+            matches = set()
+            for indexed_token, positions in self._by_token.items():
+                if token in indexed_token:
+                    matches |= positions
+            self._token_matches[token] = matches
+        return matches
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        category: Optional[str] = None,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        Search active products.
+
+        Args:
+            query: Case-insensitive substring of name, description or category
+            category: Case-insensitive substring of category
+            limit: Maximum number of results
+
+        Returns:
+            List of product rows
+        """
+        search_fields = self._search_fields
+        positions: List[int] = list(range(len(search_fields)))
+
+        if query:
+            q = query.lower()
+            tokens = TOKEN_RE.findall(q)
+            if tokens:
+                candidates = set.intersection(*(self._matches_for_token(t) for t in tokens))
+                positions = sorted(candidates)
+            # The index narrows candidates; confirm the full phrase like ILIKE '%q%' did
+            positions = [i for i in positions if any(q in field for field in search_fields[i])]
+
+        if category:
+            c = category.lower()
+            positions = [i for i in positions if c in search_fields[i][2]]
+
+        return self.to_dicts(positions[:limit])
+
+
+FTS_SEARCH_SQL = text(
+    "SELECT p.* FROM products p JOIN products_fts f ON f.rowid = p.rowid "
+    "WHERE products_fts MATCH :q AND p.is_active = 1 "
+    "AND (:category IS NULL OR p.category LIKE :category) "
+    "ORDER BY p.rowid LIMIT :limit"
+)
+
+
+async def search_products_db(
+    session: AsyncSession,
+    query: Optional[str] = None,
+    category: Optional[str] = None,
+    limit: int = 10
+) -> List[Dict[str, Any]]:
+    """
+    Search active products directly in the database.
+    Used when the in-process catalog is disabled. Uses the products_fts index
+    (prefix match per query token) on SQLite, ILIKE on other databases.
+    """
+    tokens = TOKEN_RE.findall(query.lower()) if query else []
+
+    if tokens and db_manager.fts_enabled:
+        fts_query = " ".join(f'"{token}"*' for token in tokens)
+        stmt = select(Product).from_statement(
+            FTS_SEARCH_SQL.bindparams(
+                q=fts_query,
+                category=f"%{category}%" if category else None,
+                limit=limit
+            )
+        )
+    else:
+        stmt = select(Product).where(Product.is_active == True)
+        if query:
+            search_term = f"%{query.lower()}%"
+            stmt = stmt.where(
+                (Product.name.ilike(search_term)) |
+                (Product.description.ilike(search_term)) |
+                (Product.category.ilike(search_term))
+            )
+        if category:
+            stmt = stmt.where(Product.category.ilike(f"%{category}%"))
+        stmt = stmt.limit(limit)
+
+    result = await session.execute(stmt)
+    return [_product_row(p) for p in result.scalars().all()]
+
+
+# Global product catalog instance
+# Refresh interval can be tuned via CATALOG_TTL_SECONDS (default: 60, 0 searches the database directly)
+product_catalog = ProductCatalog(ttl=float(os.getenv("CATALOG_TTL_SECONDS", "60")))
@@ -84,6 +84,8 @@ deps = [
     'python-dotenv>=1.0.0',
     'httpx>=0.26.0',
     'cryptography>=41.0.0',
+    'numpy>=1.24.0',
+    'cachetools>=5.3.0',
 ]
 for dep in deps:
     print(dep)
@@ -123,11 +125,12 @@ deps = [
     'pydantic>=2.12.0',
     'python-dotenv>=1.0.0',
     'httpx>=0.26.0',
-    'langchain-ollama>=0.1.0',
+    'langchain-ollama>=0.3.0',
     'langchain-core>=0.2.0',
     'sqlalchemy>=2.0.0',
     'aiosqlite>=0.19.0',
     'cryptography>=41.0.0',
+    'numpy>=1.24.0',
 ]
 for dep in deps:
     print(dep)